@@ -151,6 +151,10 @@ class ArithAstTest(unittest.TestCase):
 
     self.assertEqual(b'\x04', e[4:5])  # alignment 4
 
+    # Trailing padding block
+    self.assertEqual(0, len(e) % 4)
+    self.assertEqual(b'\x00\x00\x00\x00', e[-4:])
+
     # TODO: Fix after spids
     return
     self.assertEqual(b'\x02\x00\x00', e[5:8])  # root ref 2
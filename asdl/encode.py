@@ -266,6 +266,12 @@ def EncodeRoot(obj, enc, out):
   assert ref == 1
 
   root_ref = EncodeObj(obj, enc, out)
+
+  # Readers decode a 3 byte integer with a single 4 byte load, which can read
+  # 1 byte past the end of the last object.  Always end the file with a block
+  # of padding so that load stays in bounds, even when the file is mmap'd.
+  out.Write(b'\0' * enc.alignment)
+
   chunk = bytearray()
   enc.Ref(root_ref, chunk)
   out.WriteRootRef(chunk)  # back up and write it
@@ -25,6 +25,7 @@ Everything is decoded on the fly, or is a char*, which I don't think has to be
 aligned (because the natural alignment woudl be 1 byte anyway.)
 """
 
+import cStringIO
 import sys
 
 from asdl import asdl_ as asdl
@@ -34,6 +35,10 @@ from asdl import encode
 TABSIZE = 2
 MAX_COL = 80
 
+# Indentation strings for common depths, so FormatLines doesn't build one for
+# every line.
+_INDENTS = tuple(' ' * TABSIZE * d for d in range(16))
+
 # Copied from asdl_c.py
 
 
@@ -50,56 +55,90 @@ def ReflowLines(s, depth):
   if len(s) < size:
     return [s]
 
+  # Split once, then greedily pack words onto each line, instead of searching
+  # and re-slicing the remainder of the string on every iteration.
+  words = s.split(' ')
+  n = len(words)
+  k = 0  # index of the next word to place
+  remaining = len(s)  # length of the text not yet placed
+
   lines = []
-  cur = s
   padding = ""
-  while len(cur) > size:
-    i = cur.rfind(' ', 0, size)
-    # XXX this should be fixed for real
-    if i == -1 and 'GeneratorExp' in cur:
-      i = size + 3
-    assert i != -1, "Impossible line %d to reflow: %r" % (size, s)
-    lines.append(padding + cur[:i])
+  while remaining > size:
+    # A line and the space that ends it must fit within size.
+    start = k
+    width = len(words[k])
+    assert width < size, "Impossible line %d to reflow: %r" % (size, s)
+    k += 1
+    while k < n and width + 1 + len(words[k]) < size:
+      width += 1 + len(words[k])
+      k += 1
+    line = ' '.join(words[start:k])
+    remaining -= width + 1
+    lines.append(padding + line)
     if len(lines) == 1:
       # find new size based on brace
-      j = cur.find('{', 0, i)
+      j = line.find('{')
       if j >= 0:
         j += 2  # account for the brace and the space after it
         size -= j
         padding = " " * j
       else:
-        j = cur.find('(', 0, i)
+        j = line.find('(')
         if j >= 0:
           j += 1  # account for the paren (no space after it)
           size -= j
           padding = " " * j
-    cur = cur[i + 1:]
   else:
-    lines.append(padding + cur)
+    lines.append(padding + ' '.join(words[k:]))
   return lines
 
 
 def FormatLines(s, depth, reflow=True):
-  """Format lines."""
-  if reflow:
-    lines = ReflowLines(s, depth)
+  """Format lines.
+
+  Returns a single string of indented, newline-terminated lines.
+  """
+  if depth < len(_INDENTS):
+    indent = _INDENTS[depth]
   else:
-    lines = [s]
+    indent = " " * TABSIZE * depth
+  # Most lines already fit, so check here rather than calling ReflowLines.
+  if reflow and len(s) >= MAX_COL - depth * TABSIZE:
+    lines = ReflowLines(s, depth)
+    return indent + ("\n" + indent).join(lines) + "\n"
+  return indent + s + "\n"
+
 
-  result = []
-  for line in lines:
-    line = (" " * TABSIZE * depth) + line + "\n"
-    result.append(line)
-  return result
+def _ClassifyCppType(ctype, enum_types):
+  """Return the kind of accessor to generate: int, enum, str, or ref."""
+  if ctype in ('bool', 'int'):
+    return 'int'
+  if ctype.endswith('_e') or ctype in enum_types:
+    return 'enum'
+  if ctype == 'char*':
+    return 'str'
+  return 'ref'
 
 
 class ChainOfVisitors:
+  """Run several visitors over a module in a single traversal.
+
+  Each type is passed to every visitor before moving on to the next, so the
+  visitors should write to separate streams if their output must not be
+  interleaved.
+  """
   def __init__(self, *visitors):
     self.visitors = visitors
 
   def VisitModule(self, module):
     for v in self.visitors:
-      v.VisitModule(module)
+      v.BeginModule(module)
+    for dfn in module.dfns:
+      for v in self.visitors:
+        v.VisitType(dfn)
+    for v in self.visitors:
+      v.EmitFooter()
 
 
 _BUILTINS = {
@@ -113,70 +152,124 @@ class AsdlVisitor:
   def __init__(self, f):
     self.f = f
     self.module = None
+    self._cpp_type_cache = {}  # (type name, opt) -> C++ type string
+    self._simple_sums = set()  # names of sum types that become enums
 
   def GetCppType(self, field):
     """Return a string for the C++ name of the type."""
-    type_name = field.type
-
+    key = (field.type, field.opt)
+    cpp_type = self._cpp_type_cache.get(key)
+    if cpp_type is None:
+      cpp_type = self._GetCppType(field.type, field.opt)
+      self._cpp_type_cache[key] = cpp_type
+    return cpp_type
+
+  def _GetCppType(self, type_name, opt):
     cpp_type = _BUILTINS.get(type_name)
     if cpp_type is not None:
       return cpp_type
 
-    typ = self.module.types[type_name]
-    if isinstance(typ, asdl.Sum) and asdl.is_simple(typ):
+    if type_name in self._simple_sums:
       # Use the enum instead of the class.
-      return "%s_e" % type_name
+      return type_name + "_e"
 
     # - Pointer for optional type.
     # - ints and strings should generally not be optional?  We don't have them
     # in osh yet, so leave it out for now.
-    if field.opt:
-      return "%s_t*" % type_name
+    if opt:
+      return type_name + "_t*"
 
-    return "%s_t&" % type_name
+    return type_name + "_t&"
 
   def Emit(self, s, depth, reflow=True):
-    for line in FormatLines(s, depth):
-      self.f.write(line)
+    self.f.write(FormatLines(s, depth, reflow))
 
-  def VisitModule(self, mod):
+  def EmitLines(self, lines):
+    """Format a sequence of (s, depth) pairs and write them all at once."""
+    self.f.write(''.join([FormatLines(s, depth) for s, depth in lines]))
+
+  def BeginModule(self, mod):
     self.module = mod  # Save it for GetCppType to look up types.
+    self._cpp_type_cache.clear()
+    self._simple_sums = set(
+        name for name, typ in mod.types.items()
+        if isinstance(typ, asdl.Sum) and asdl.is_simple(typ))
 
+  def VisitModule(self, mod):
+    self.BeginModule(mod)
     for dfn in mod.dfns:
       self.VisitType(dfn)
     self.EmitFooter()
 
-  def VisitType(self, typ, depth=0):
+  def VisitType(self, typ):
     if isinstance(typ.value, asdl.Sum):
-      self.VisitSum(typ.value, typ.name, depth)
+      self.VisitSum(typ.value, typ.name)
     elif isinstance(typ.value, asdl.Product):
-      self.VisitProduct(typ.value, typ.name, depth)
+      self.VisitProduct(typ.value, typ.name)
     else:
       raise AssertionError(typ)
 
-  def VisitSimpleSum(self, sum, name, depth):
+  def VisitSimpleSum(self, sum, name):
     pass
 
-  def VisitSum(self, sum, name, depth):
+  def VisitSum(self, sum, name):
     if asdl.is_simple(sum):
-      self.VisitSimpleSum(sum, name, depth)
+      self.VisitSimpleSum(sum, name)
     else:
-      self.VisitCompoundSum(sum, name, depth)
+      self.VisitCompoundSum(sum, name)
 
 
 class ForwardDeclareVisitor(AsdlVisitor):
   """Print forward declarations.
 
   ASDL allows forward references of types, but C++ doesn't.
-  """
-  def VisitCompoundSum(self, sum, name, depth):
-    self.Emit("class %(name)s_t;" % locals(), depth)
 
-  def VisitProduct(self, product, name, depth):
-    self.Emit("class %(name)s_t;" % locals(), depth)
+  Only the class names are needed, so all of them are written in one block at
+  the start of the module, instead of one per VisitType() call.
+  """
+  def BeginModule(self, mod):
+    AsdlVisitor.BeginModule(self, mod)
+    # Simple sums become enums; everything else gets a class.
+    lines = [
+        'class ' + dfn.name + '_t;\n' for dfn in mod.dfns
+        if dfn.name not in self._simple_sums
+    ]
+    lines.append('\n')  # blank line
+    self.f.write(''.join(lines))
+
+  def VisitType(self, typ):
+    pass
 
   def EmitFooter(self):
-    self.Emit("", 0)  # blank line
+    pass
+
+
+# For the size accessor of a sequence, follow the ref, and then it's the first
+# integer.
+_SIZE_HEADER = 'inline int %(name)s_size(const %(pointer_type)s* base) const {'
+_SIZE_BODY = 'return Ref(base, %(offset)d).Int(0);'
+
+_ARRAY_OFFSET = 'int a = (index+1) * 3;'
+
+# Sequences also get an overload for a constant index, e.g. args<0>(base),
+# where the offset of the element is computed at compile time.
+_SEQ_TEMPLATE = 'template <int index>'
+_CONST_ARRAY_OFFSET = 'constexpr int a = (index+1) * 3;'
+
+# ASDL types are never nested, so the classes are always at the top level and
+# their members at depth 1.  These blocks are written out whole.  All sum types
+# have a tag.
+_SUM_CLASS = """\
+class %(name)s_t : public Obj {
+ public:
+  %(name)s_e tag() const {
+    return static_cast<%(name)s_e>(bytes_[0]);
+  }
+};
+
+"""
+_CLASS_BEGIN = 'class %s : public %s {\n public:\n'
+_CLASS_END = '};\n\n'
 
 
 class ClassDefVisitor(AsdlVisitor):
@@ -187,80 +280,111 @@ class ClassDefVisitor(AsdlVisitor):
     self.ref_width = enc.ref_width
     self.enum_types = enum_types or {}
     self.pointer_type = enc.pointer_type
-    self.footer = []  # lines
+    self.footer = cStringIO.StringIO()  # method bodies written at the end
+
+    # Accessor signatures, with the pointer type filled in once up front.
+    # VisitField only has to substitute the per-field parts.
+    self.a_pointer = (
+        'inline const %%(ctype)s %%(maybe_qual_name)s('
+        'const %s* base, int index) const' % enc.pointer_type)
+    self.a_template_pointer = (
+        'inline const %%(ctype)s %%(maybe_qual_name)s('
+        'const %s* base) const' % enc.pointer_type)
+    POINTER = (
+        'inline const %%(ctype)s %%(maybe_qual_name)s('
+        'const %s* base) const' % enc.pointer_type)
+    SIMPLE = 'inline %(ctype)s %(maybe_qual_name)s() const'
+
+    # Accessor kind -> (body, out_of_line).  Out-of-line accessors get a
+    # prototype in the class and a body in the footer.  All sequence accessors
+    # share the same headers and array offset lines; see VisitField.
+    self.seq_handlers = {
+        'int': ('return Ref(base, %(offset)d).Int(a);', False),
+        'enum': (
+            'return static_cast<const %(ctype)s>(Ref(base, %(offset)d).Int(a));',
+            False),
+        'str': ('return Ref(base, %(offset)d).Str(base, a);', False),
+        'ref': (
+            'return static_cast<const %(ctype)s>('
+            'Ref(base, %(offset)d).Ref(base, a));', True),
+    }
+    # Accessor kind -> (header, body, out_of_line).
+    self.scalar_handlers = {
+        'int': (SIMPLE, 'return Int(%(offset)d);', False),
+        'enum': (
+            SIMPLE, 'return static_cast<const %(ctype)s>(Int(%(offset)d));',
+            False),
+        'str': (POINTER, 'return Str(base, %(offset)d);', False),
+        'ref': (
+            POINTER,
+            'return static_cast<const %(ctype)s>(Ref(base, %(offset)d));', True),
+        'opt_ref': (
+            POINTER,
+            'return static_cast<const %(ctype)s>(Optional(base, %(offset)d));',
+            True),
+    }
+
+  def BeginModule(self, mod):
+    # Attributes are only handled for builtin types.  Check them all once up
+    # front instead of on every visit.
+    for dfn in mod.dfns:
+      for field in dfn.value.attributes:
+        assert field.type in asdl.builtin_types, field.type
+    AsdlVisitor.BeginModule(self, mod)
 
   def EmitFooter(self):
-    for line in self.footer:
-      self.f.write(line)
+    self.f.write(self.footer.getvalue())
 
-  def EmitEnum(self, sum, name, depth):
+  def EmitEnum(self, sum, name):
     enum = []
     for i in range(len(sum.types)):
       type = sum.types[i]
       enum.append("%s = %d" % (type.name, i + 1))  # zero is reserved
 
-    self.Emit("enum class %s_e : uint8_t {" % name, depth)
-    self.Emit(", ".join(enum), depth + 1)
-    self.Emit("};", depth)
-    self.Emit("", depth)
-
-  def VisitSimpleSum(self, sum, name, depth):
-    self.EmitEnum(sum, name, depth)
+    self.EmitLines([
+        ("enum class %s_e : uint8_t {" % name, 0),
+        (", ".join(enum), 1),
+        ("};", 0),
+        ("", 0),
+    ])
 
-  def VisitCompoundSum(self, sum, name, depth):
-    # This is a sign that Python needs string interpolation!!!
-    def Emit(s, depth=depth):
-      self.Emit(s % sys._getframe(1).f_locals, depth)
+  def VisitSimpleSum(self, sum, name):
+    self.EmitEnum(sum, name)
 
-    self.EmitEnum(sum, name, depth)
+  def VisitCompoundSum(self, sum, name):
+    self.EmitEnum(sum, name)
+    self.f.write(_SUM_CLASS % {'name': name})
 
-    Emit("class %(name)s_t : public Obj {")
-    Emit(" public:")
-    # All sum types have a tag
-    Emit("%(name)s_e tag() const {", depth + 1)
-    Emit("return static_cast<%(name)s_e>(bytes_[0]);", depth + 2)
-    Emit("}", depth + 1)
-    Emit("};")
-    Emit("")
-
-    super_name = "%s_t" % name
+    super_name = name + "_t"
     for t in sum.types:
-      self.VisitConstructor(t, super_name, depth)
+      self.VisitConstructor(t, super_name)
 
     # rudimentary attribute handling
     for field in sum.attributes:
-      type = str(field.type)
-      assert type in asdl.builtin_types, type
-      Emit("%s %s;" % (type, field.name), depth + 1)
+      self.Emit("%s %s;" % (field.type, field.name), 1)
 
-  def VisitConstructor(self, cons, def_name, depth):
+  def VisitConstructor(self, cons, def_name):
     #print(dir(cons))
     if cons.fields:
-      self.Emit("class %s : public %s {" % (cons.name, def_name), depth)
-      self.Emit(" public:", depth)
+      self.f.write(_CLASS_BEGIN % (cons.name, def_name))
       offset = 1  #  for the ID
       for f in cons.fields:
-        self.VisitField(f, cons.name, offset, depth + 1)
+        self.VisitField(f, cons.name, offset, 1)
         offset += self.ref_width
-      self.Emit("};", depth)
-      self.Emit("", depth)
+      self.f.write(_CLASS_END)
 
-  def VisitProduct(self, product, name, depth):
-    self.Emit("class %(name)s_t : public Obj {" % locals(), depth)
-    self.Emit(" public:", depth)
+  def VisitProduct(self, product, name):
+    type_name = name + '_t'
+    self.f.write(_CLASS_BEGIN % (type_name, 'Obj'))
     offset = 0
     for f in product.fields:
-      type_name = '%s_t' % name
-      self.VisitField(f, type_name, offset, depth + 1)
+      self.VisitField(f, type_name, offset, 1)
       offset += self.ref_width
 
     for field in product.attributes:
       # rudimentary attribute handling
-      type = str(field.type)
-      assert type in asdl.builtin_types, type
-      self.Emit("%s %s;" % (type, field.name), depth + 1)
-    self.Emit("};", depth)
-    self.Emit("", depth)
+      self.Emit("%s %s;" % (field.type, field.name), 1)
+    self.f.write(_CLASS_END)
 
   def VisitField(self, field, type_name, offset, depth):
     """
@@ -273,140 +397,72 @@ class ClassDefVisitor(AsdlVisitor):
     """
     ctype = self.GetCppType(field)
     name = field.name
-    pointer_type = self.pointer_type
-    # Either 'left' or 'BoolBinary::left', depending on whether it's inline.
-    # Mutated later.
-    maybe_qual_name = name
+    d = {
+        'ctype': ctype,
+        'name': name,
+        # 'left' here, or 'BoolBinary::left' for out-of-line definitions.
+        'maybe_qual_name': name,
+        'offset': offset,
+        'pointer_type': self.pointer_type,
+    }
 
-    func_proto = None
-    func_header = None
-    body_line1 = None
-    inline_body = None
+    kind = _ClassifyCppType(ctype, self.enum_types)
 
     if field.seq:  # Array/repeated
-      # For size accessor, follow the ref, and then it's the first integer.
-      size_header = (
-          'inline int %(name)s_size(const %(pointer_type)s* base) const {')
-      size_body = "return Ref(base, %(offset)d).Int(0);"
-
-      self.Emit(size_header % locals(), depth)
-      self.Emit(size_body % locals(), depth + 1)
-      self.Emit("}", depth)
-
-      ARRAY_OFFSET = 'int a = (index+1) * 3;'
-      A_POINTER = (
-          'inline const %(ctype)s %(maybe_qual_name)s('
-          'const %(pointer_type)s* base, int index) const')
-
-      if ctype in ('bool', 'int'):
-        func_header = A_POINTER + ' {'
-        body_line1 = ARRAY_OFFSET
-        inline_body = 'return Ref(base, %(offset)d).Int(a);'
-
-      elif ctype.endswith('_e'):
-        func_header = A_POINTER + ' {'
-        body_line1 = ARRAY_OFFSET
-        inline_body = (
-            'return static_cast<const %(ctype)s>(Ref(base, %(offset)d).Int(a));')
-
-      elif ctype == 'char*':
-        func_header = A_POINTER + ' {'
-        body_line1 = ARRAY_OFFSET
-        inline_body = 'return Ref(base, %(offset)d).Str(base, a);'
-
-      else:
-        # Write function prototype now; write body later.
-        func_proto = A_POINTER + ';'
-
-        maybe_qual_name = '%s::%s' % (type_name, name)
-        func_def = A_POINTER + ' {'
-        # This static_cast<> (downcast) causes problems if put within "class
-        # {}".
-        func_body = (
-            'return static_cast<const %(ctype)s>('
-            'Ref(base, %(offset)d).Ref(base, a));')
-
-        self.footer.extend(FormatLines(func_def % locals(), 0))
-        self.footer.extend(FormatLines(ARRAY_OFFSET, 1))
-        self.footer.extend(FormatLines(func_body % locals(), 1))
-        self.footer.append('}\n\n')
-        maybe_qual_name = name  # RESET for later
+      self.EmitLines([
+          (_SIZE_HEADER % d, depth),
+          (_SIZE_BODY % d, depth + 1),
+          ("}", depth),
+      ])
+
+      body, out_of_line = self.seq_handlers[kind]
+      # (template line, header, body_line1) for the runtime index accessor and
+      # the constant index one.
+      accessors = [
+          (None, self.a_pointer, _ARRAY_OFFSET),
+          (_SEQ_TEMPLATE, self.a_template_pointer, _CONST_ARRAY_OFFSET),
+      ]
 
     else:  # not repeated
-      SIMPLE = "inline %(ctype)s %(maybe_qual_name)s() const {"
-      POINTER = (
-          'inline const %(ctype)s %(maybe_qual_name)s('
-          'const %(pointer_type)s* base) const')
-
-      if ctype in ('bool', 'int'):
-        func_header = SIMPLE
-        inline_body = 'return Int(%(offset)d);'
-
-      elif ctype.endswith('_e') or ctype in self.enum_types:
-        func_header = SIMPLE
-        inline_body = 'return static_cast<const %(ctype)s>(Int(%(offset)d));'
-
-      elif ctype == 'char*':
-        func_header = POINTER + " {"
-        inline_body = 'return Str(base, %(offset)d);'
-
-      else:
-        # Write function prototype now; write body later.
-        func_proto = POINTER + ";"
-
-        maybe_qual_name = '%s::%s' % (type_name, name)
-        func_def = POINTER + ' {'
-        if field.opt:
-          func_body = (
-              'return static_cast<const %(ctype)s>(Optional(base, %(offset)d));')
-        else:
-          func_body = (
-              'return static_cast<const %(ctype)s>(Ref(base, %(offset)d));')
-
-        # depth 0 for bodies
-        self.footer.extend(FormatLines(func_def % locals(), 0))
-        self.footer.extend(FormatLines(func_body % locals(), 1))
-        self.footer.append('}\n\n')
-        maybe_qual_name = name  # RESET for later
-
-    if func_proto:
-      self.Emit(func_proto % locals(), depth)
+      if kind == 'ref' and field.opt:
+        kind = 'opt_ref'
+      header, body, out_of_line = self.scalar_handlers[kind]
+      accessors = [(None, header, None)]
+
+    for template, header, body_line1 in accessors:
+      self._EmitAccessor(
+          d, type_name, template, header, body_line1, body, out_of_line, depth)
+
+  def _EmitAccessor(self, d, type_name, template, header, body_line1, body,
+                    out_of_line, depth):
+    """Write one accessor, either in the class or out of line in the footer."""
+    sig = [template] if template else []
+
+    if out_of_line:
+      # Write function prototype now; write body later.  The static_cast<>
+      # (downcast) causes problems if put within "class {}".
+      self.EmitLines([(line, depth) for line in sig + [header % d + ';']])
+
+      qual_d = dict(d, maybe_qual_name='%s::%s' % (type_name, d['name']))
+      # depth 0 for bodies.  Write the whole definition at once.
+      parts = [FormatLines(line, 0) for line in sig]
+      parts.append(FormatLines(header % qual_d + ' {', 0))
+      if body_line1:
+        parts.append(FormatLines(body_line1, 1))
+      parts.append(FormatLines(body % d, 1))
+      parts.append('}\n\n')
+      self.footer.write(''.join(parts))
     else:
-      self.Emit(func_header % locals(), depth)
+      lines = [(line, depth) for line in sig]
+      lines.append((header % d + ' {', depth))
       if body_line1:
-        self.Emit(body_line1, depth + 1)
-      self.Emit(inline_body % locals(), depth + 1)
-      self.Emit("}", depth)
-
-
-def main(argv):
-  try:
-    action = argv[1]
-  except IndexError:
-    raise RuntimeError('Action required')
-
-  # TODO: Also generate a switch/static_cast<> pretty printer in C++!  For
-  # debugging.  Might need to detect cycles though.
-  if action == 'cpp':
-    schema_path = argv[2]
-    module = asdl.parse(schema_path)
+        lines.append((body_line1, depth + 1))
+      lines.append((body % d, depth + 1))
+      lines.append(("}", depth))
+      self.EmitLines(lines)
 
-    f = sys.stdout
-
-    # How do mutation of strings, arrays, etc.  work?  Are they like C++
-    # containers, or their own?  I think they mirror the oil language
-    # semantics.
-    # Every node should have a mirror.  MutableObj.  MutableRef (pointer).
-    # MutableArithVar -- has std::string.  The mirrors are heap allocated.
-    # All the mutable ones should support Dump()/Encode()?
-    # You can just write more at the end... don't need to disturb existing
-    # nodes?  Rewrite pointers.
 
-    alignment = 4
-    enc = encode.Params(alignment)
-    d = {'pointer_type': enc.pointer_type}
-
-    f.write("""\
+_HEADER = """\
 #include <cstdint>
 
 class Obj {
@@ -425,17 +481,22 @@ class Obj {
   uint8_t bytes_[1];  // first is ID; rest are a payload
 };
 
-""" % d)
-
-    # Id should be treated as an enum.
-    c = ChainOfVisitors(
-        ForwardDeclareVisitor(f),
-        ClassDefVisitor(f, enc, enum_types=['Id']))
-    c.VisitModule(module)
+"""
 
-    f.write("""\
+# uint32_t* and char*/Obj* aren't related, so we need to use
+# reinterpret_cast<>.
+# http://stackoverflow.com/questions/10151834/why-cant-i-static-cast-between-char-and-unsigned-char
+_FOOTER = """\
 inline int Obj::Int(int n) const {
+#if defined(__BYTE_ORDER__) && __BYTE_ORDER__ == __ORDER_LITTLE_ENDIAN__
+  // One unaligned 4 byte load, masked to 3 bytes.  This may read 1 byte past
+  // the end of an object; encode.py ends every file with a padding block.
+  uint32_t v;
+  __builtin_memcpy(&v, bytes_ + n, 4);
+  return v & 0xFFFFFF;
+#else
   return bytes_[n] + (bytes_[n+1] << 8) + (bytes_[n+2] << 16);
+#endif
 }
 
 inline const Obj& Obj::Ref(const %(pointer_type)s* base, int n) const {
@@ -456,10 +517,48 @@ inline const char* Obj::Str(const %(pointer_type)s* base, int n) const {
   int offset = Int(n);
   return reinterpret_cast<const char*>(base + offset);
 }
-""" % d)
-  # uint32_t* and char*/Obj* aren't related, so we need to use
-  # reinterpret_cast<>.
-  # http://stackoverflow.com/questions/10151834/why-cant-i-static-cast-between-char-and-unsigned-char
+"""
+
+
+def main(argv):
+  try:
+    action = argv[1]
+  except IndexError:
+    raise RuntimeError('Action required')
+
+  # TODO: Also generate a switch/static_cast<> pretty printer in C++!  For
+  # debugging.  Might need to detect cycles though.
+  if action == 'cpp':
+    schema_path = argv[2]
+    module = asdl.parse(schema_path)
+
+    # Accumulate the generated code in memory, and write it out with the
+    # header and footer at the end, rather than issuing a write() per line.
+    # The visitors run in a single pass, so each gets its own buffer.
+    decl_f = cStringIO.StringIO()
+    class_f = cStringIO.StringIO()
+
+    # How do mutation of strings, arrays, etc.  work?  Are they like C++
+    # containers, or their own?  I think they mirror the oil language
+    # semantics.
+    # Every node should have a mirror.  MutableObj.  MutableRef (pointer).
+    # MutableArithVar -- has std::string.  The mirrors are heap allocated.
+    # All the mutable ones should support Dump()/Encode()?
+    # You can just write more at the end... don't need to disturb existing
+    # nodes?  Rewrite pointers.
+
+    alignment = 4
+    enc = encode.Params(alignment)
+    d = {'pointer_type': enc.pointer_type}
+
+    # Id should be treated as an enum.
+    c = ChainOfVisitors(
+        ForwardDeclareVisitor(decl_f),
+        ClassDefVisitor(class_f, enc, enum_types=['Id']))
+    c.VisitModule(module)
+
+    sys.stdout.write(''.join([
+        _HEADER % d, decl_f.getvalue(), class_f.getvalue(), _FOOTER % d]))
 
   else:
     raise RuntimeError('Invalid action %r' % action)
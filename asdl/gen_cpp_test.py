@@ -0,0 +1,55 @@
+#!/usr/bin/python
+"""
+gen_cpp_test.py: Tests for gen_cpp.py
+"""
+
+import unittest
+
+from asdl import gen_cpp  # module under test
+
+
+class ReflowLinesTest(unittest.TestCase):
+
+  def testFits(self):
+    s = 'inline int foo() const {'
+    self.assertEqual([s], gen_cpp.ReflowLines(s, 0))
+
+  def testBracePadding(self):
+    s = ('class FooBarBaz : public Obj { int alpha; int beta; int gamma; '
+         'int delta; int epsilon; int zeta; };')
+    lines = gen_cpp.ReflowLines(s, 0)
+    self.assertEqual([
+        'class FooBarBaz : public Obj { int alpha; int beta; int gamma; '
+        'int delta; int',
+        ' ' * 31 + 'epsilon; int zeta; };',
+    ], lines)
+
+  def testParenPadding(self):
+    s = ('inline const arith_expr_t& FuncCall::args('
+         'const uint32_t* base, int index) const;')
+    lines = gen_cpp.ReflowLines(s, 1)
+    self.assertEqual([
+        'inline const arith_expr_t& FuncCall::args('
+        'const uint32_t* base, int index)',
+        ' ' * 42 + 'const;',
+    ], lines)
+    for line in lines:
+      self.assertTrue(len(line) < gen_cpp.MAX_COL - gen_cpp.TABSIZE)
+
+  def testConsecutiveSpaces(self):
+    # Empty words between spaces are preserved, so no space is lost.
+    s = 'a  b' * 25
+    lines = gen_cpp.ReflowLines(s, 0)
+    self.assertEqual([
+        'a ' + ' ba ' * 19,
+        'ba  ba  ba  ba  ba  b',
+    ], lines)
+    self.assertEqual(s, ' '.join(lines))
+
+  def testImpossibleLine(self):
+    s = 'x' * 100
+    self.assertRaises(AssertionError, gen_cpp.ReflowLines, s, 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -33,10 +33,12 @@ asdl-py() {
   asdl/asdl_demo.py py $schema
 }
 
+# gen_cpp.py is pure Python with no CPython-specific tricks, so it can be run
+# under a faster interpreter, e.g. ASDL_PYTHON=pypy ./run.sh asdl-cpp
 asdl-cpp() {
   local schema=${1:-asdl/arith.asdl}
   local src=${2:-_tmp/arith.asdl.h}
-  asdl/gen_cpp.py cpp $schema > $src
+  ${ASDL_PYTHON:-} asdl/gen_cpp.py cpp $schema > $src
   ls -l $src
   wc -l $src
 }
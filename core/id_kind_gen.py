@@ -17,8 +17,7 @@ from core.id_kind import Id, Kind, LookupKind
 
 
 def Emit(s, f, depth=0):
-  for line in FormatLines(s, depth):
-    f.write(line)
+  f.write(FormatLines(s, depth))
 
 
 def GenCppCode(kind_names, id_names, f, id_labels=None, kind_labels=None):